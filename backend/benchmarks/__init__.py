@@ -0,0 +1,4 @@
+"""
+Benchmark harness: synthetic codebases + mocked Groq/GitHub endpoints.
+Run from the backend/ directory with `python -m benchmarks.run`.
+"""
@@ -0,0 +1,72 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+Usage (from backend/):
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.15
+
+Exits with status 1 if any stage's p50/p99 latency or peak memory (in this
+process or in the worker/child processes it used) grew by more than the
+threshold, so it can gate CI. Metrics a run left out are skipped.
+"""
+
+import argparse
+import json
+import sys
+
+# metric -> True if higher is worse
+METRICS = {
+    "p50_ms": True,
+    "p99_ms": True,
+    "peak_mem_kb": True,
+    "child_peak_mem_kb": True,
+    "throughput_per_sec": False,
+}
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> list:
+    """Return a list of (stage, metric, old, new, change, regressed) rows."""
+    rows = []
+    for stage, new_stats in candidate.get("stages", {}).items():
+        old_stats = baseline.get("stages", {}).get(stage)
+        if not old_stats:
+            continue
+        for metric, higher_is_worse in METRICS.items():
+            old, new = old_stats.get(metric), new_stats.get(metric)
+            if not old or new is None:
+                continue  # not measured in one of the runs
+            change = (new - old) / old
+            regressed = change > threshold if higher_is_worse else change < -threshold
+            rows.append((stage, metric, old, new, change, regressed))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark JSON files.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed relative change (default 15%%)")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    if baseline.get("meta", {}).get("files") != candidate.get("meta", {}).get("files"):
+        print("⚠ Warning: runs used different codebase sizes; comparison may be meaningless")
+
+    rows = compare(baseline, candidate, args.threshold)
+    regressions = 0
+    for stage, metric, old, new, change, regressed in rows:
+        flag = "REGRESSION" if regressed else ""
+        regressions += regressed
+        print(f"{stage:<14} {metric:<20} {old:>12} → {new:<12} {change:+7.1%}  {flag}")
+
+    if regressions:
+        print(f"\n✗ {regressions} regression(s) above {args.threshold:.0%}")
+        sys.exit(1)
+    print("\n✓ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Local mock transports for the Groq and GitHub HTTP APIs.
+Every httpx.AsyncClient created inside `mock_http()` is routed to these handlers,
+so benchmarks never touch the network.
+"""
+
+import base64
+import itertools
+from contextlib import contextmanager
+from typing import Dict, List
+from unittest import mock
+
+import httpx
+
+
+def github_handler(files: Dict[str, str], owner: str = "bench", repo: str = "synthetic"):
+    """Serve repo info, a recursive tree and base64 contents for `files`."""
+    api_base = f"/repos/{owner}/{repo}"
+    tree = {
+        "truncated": False,
+        "tree": [
+            {"path": path, "type": "blob", "size": len(content.encode("utf-8"))}
+            for path, content in files.items()
+        ],
+    }
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path == api_base:
+            return httpx.Response(200, json={"default_branch": "main"})
+        if path == f"{api_base}/git/trees/main":
+            return httpx.Response(200, json=tree)
+        if path.startswith(f"{api_base}/contents/"):
+            file_path = path[len(f"{api_base}/contents/"):]
+            if file_path not in files:
+                return httpx.Response(404, json={"message": "Not Found"})
+            encoded = base64.b64encode(files[file_path].encode("utf-8")).decode("ascii")
+            return httpx.Response(200, json={"encoding": "base64", "content": encoded})
+        return httpx.Response(404, json={"message": "Not Found"})
+
+    return handle
+
+
+def groq_handler(answers: List[str]):
+    """Serve /models and rotate through canned chat completion answers."""
+    cycle = itertools.cycle(answers)
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/models"):
+            return httpx.Response(200, json={"data": []})
+        if request.url.path.endswith("/chat/completions"):
+            return httpx.Response(200, json={
+                "choices": [{"message": {"role": "assistant", "content": next(cycle)}}],
+            })
+        return httpx.Response(404, json={"error": "not found"})
+
+    return handle
+
+
+@contextmanager
+def mock_http(github=None, groq=None):
+    """Route api.github.com and api.groq.com traffic to the given handlers."""
+    def dispatch(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        if host == "api.github.com" and github:
+            return github(request)
+        if host == "api.groq.com" and groq:
+            return groq(request)
+        return httpx.Response(503, json={"error": f"no mock for {host}"})
+
+    transport = httpx.MockTransport(dispatch)
+    real_client = httpx.AsyncClient
+
+    def client_factory(*args, **kwargs):
+        kwargs["transport"] = transport
+        return real_client(*args, **kwargs)
+
+    with mock.patch.object(httpx, "AsyncClient", client_factory):
+        yield
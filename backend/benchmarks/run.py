@@ -0,0 +1,240 @@
+"""
+Benchmark runner.
+
+Usage (from backend/):
+    python -m benchmarks.run --files 300 --mix py=0.5,js=0.3,go=0.2 --out bench.json
+    python -m benchmarks.compare baseline.json bench.json
+
+Each stage reports throughput, p50/p99 latency and peak traced memory. Stages
+that do work in other processes also report that work's peak: the largest
+ingest worker batch (traced) for `ingest_zip`, the child's max RSS for startup.
+Startup stages time `import main` and launch-to-first-healthy-response in
+fresh processes; `python -m benchmarks.startup` prints the import profile.
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import platform
+import statistics
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+# Never let a benchmark pick up real credentials
+os.environ["GROQ_API_KEY"] = "bench-key"
+os.environ.pop("GITHUB_TOKEN", None)
+
+from codebase_parser import parse_codebase, parse_zip, fetch_github_repo, shutdown_ingest_pool, MAX_FILES
+from blob_store import Codebase
+from llm_handler import _build_context, _parse_snippets_from_answer, ask_llm_with_context
+from citations import CitationIndex
+
+from benchmarks.synthetic import QUESTIONS, DEFAULT_MIX, parse_mix, generate_codebase, write_codebase, write_zip, make_llm_answers
+from benchmarks.mocks import mock_http, github_handler, groq_handler
+from benchmarks import startup
+
+
+# ─── Measurement ──────────────────────────────────────────────────────────────
+
+MIN_P99_SAMPLES = 20  # below this, "p99" is just the slowest run; don't report it
+
+def _percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(samples)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[k]
+
+
+def _call(fn: Callable):
+    result = fn()
+    if inspect.isawaitable(result):
+        result = asyncio.get_event_loop().run_until_complete(result)
+    return result
+
+
+def measure(fn: Callable, iterations: int, items_per_call: int = 1, warmup: int = 1,
+            trace_memory: bool = True, child_memory: bool = False) -> dict:
+    """
+    Time `fn` (sync or async, no args) `iterations` times, then run it once more
+    for memory so tracing overhead doesn't skew latency:
+    - trace_memory: peak tracemalloc memory in this process (`peak_mem_kb`).
+    - child_memory: the run calls fn(peaks) and fn appends the peak bytes of the
+      work it did in other processes (`child_peak_mem_kb`, the largest reported).
+    """
+    for _ in range(warmup):
+        _call(fn)
+
+    latencies = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        _call(fn)
+        latencies.append(time.perf_counter() - t0)
+
+    peak, child_peaks = None, [] if child_memory else None
+    if trace_memory or child_memory:
+        if trace_memory:
+            tracemalloc.start()
+        try:
+            _call(lambda: fn(child_peaks) if child_memory else fn())
+            if trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+        finally:
+            if trace_memory:
+                tracemalloc.stop()
+    child_peak = max((p for p in child_peaks or () if p is not None), default=None)
+
+    total = sum(latencies)
+    return {
+        "iterations": iterations,
+        "items_per_call": items_per_call,
+        "throughput_per_sec": round(iterations * items_per_call / total, 2) if total else None,
+        "mean_ms": round(statistics.mean(latencies) * 1000, 3),
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3) if iterations >= MIN_P99_SAMPLES else None,
+        "peak_mem_kb": round(peak / 1024, 1) if peak is not None else None,
+        "child_peak_mem_kb": round(child_peak / 1024, 1) if child_peak is not None else None,
+    }
+
+
+# ─── Stages ───────────────────────────────────────────────────────────────────
+
+def _cycle(items: list) -> Callable:
+    """Return a function that yields the next item on each call."""
+    state = {"i": 0}
+
+    def nxt():
+        item = items[state["i"] % len(items)]
+        state["i"] += 1
+        return item
+
+    return nxt
+
+
+def build_stages(codebase: Dict[str, str], tmp_dir: str, answers: List[str]) -> Dict[str, tuple]:
+    """
+    Return { stage_name: (fn, items_per_call, in_process, child_memory) }.
+    Stages with child_memory accept an optional `peaks` list (see measure).
+    """
+    next_question = _cycle(QUESTIONS)
+    next_answer = _cycle(answers)
+    ingested = min(len(codebase), MAX_FILES)
+    zip_path = os.path.join(tmp_dir, "repo.zip")
+    # Query stages run against the same blob-backed mapping the API holds
+    loaded = Codebase(codebase)
+
+    return {
+        "ingest_dir": (lambda: parse_codebase(os.path.join(tmp_dir, "tree")), ingested, True, False),
+        # Decoding runs in the ingest process pool; each worker batch reports its own peak
+        "ingest_zip": (lambda peaks=None: parse_zip(zip_path, worker_peaks=peaks), ingested, True, True),
+        "ingest_github": (lambda: fetch_github_repo("https://github.com/bench/synthetic"), ingested, True, False),
+        # A fresh index from a plain dict every call: `snippets` reuses the cached one
+        "citation_index": (lambda: CitationIndex(codebase), len(codebase), True, False),
+        "retrieval": (lambda: _build_context(loaded, next_question()), 1, True, False),
+        "snippets": (lambda: _parse_snippets_from_answer(next_answer(), loaded), 1, True, False),
+        "ask_e2e": (lambda: ask_llm_with_context(next_question(), loaded), 1, True, False),
+        # Cold start in fresh processes, with Supabase unreachable; memory is the child's peak RSS
+        "startup_import": (lambda peaks=None: startup.import_main(peaks), 1, False, True),
+        "startup_live": (lambda peaks=None: startup.time_to_live(peaks=peaks), 1, False, True),
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, timeout=10,
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def run(args) -> dict:
+    mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+    codebase = generate_codebase(args.files, mix=mix, funcs_per_file=args.funcs, seed=args.seed)
+    answers = make_llm_answers(codebase, count=len(QUESTIONS), seed=args.seed)
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        write_codebase(codebase, os.path.join(tmp_dir, "tree"))
+        write_zip(codebase, os.path.join(tmp_dir, "repo.zip"))
+        stages = build_stages(codebase, tmp_dir, answers)
+        selected = args.stages.split(",") if args.stages else list(stages)
+        unknown = [s for s in selected if s not in stages]
+        if unknown:
+            raise SystemExit(f"Unknown stage(s): {', '.join(unknown)}. Available: {', '.join(stages)}")
+
+        results = {}
+        with mock_http(github=github_handler(codebase), groq=groq_handler(answers)):
+            for name in selected:
+                fn, items, in_process, child_memory = stages[name]
+                # Ingest and startup stages are much heavier; scale iterations down,
+                # but keep enough runs for a real p99
+                heavy = name.startswith(("ingest", "startup"))
+                iterations = max(MIN_P99_SAMPLES, args.iterations // 5) if heavy else args.iterations
+                stats = results[name] = measure(fn, iterations, items_per_call=items,
+                                                trace_memory=in_process, child_memory=child_memory)
+                p99 = f"{stats['p99_ms']:>9.3f}" if stats["p99_ms"] is not None else f"{'n/a':>9}"
+                peak = f"{stats['peak_mem_kb']:>9.1f}" if stats["peak_mem_kb"] is not None else f"{'n/a':>9}"
+                child = f"   child peak {stats['child_peak_mem_kb']:>9.1f} KB" if child_memory else ""
+                print(f"  {name:<14} p50 {stats['p50_ms']:>9.3f} ms   p99 {p99} ms   "
+                      f"{stats['throughput_per_sec']:>10} items/s   peak {peak} KB{child}")
+        if any(name.startswith("startup") for name in selected):
+            import_profile = [{"module": m, "ms": round(us / 1000, 1)} for m, us in startup.import_profile()]
+        else:
+            import_profile = []
+    finally:
+        shutdown_ingest_pool()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "files": args.files,
+            "mix": mix,
+            "funcs_per_file": args.funcs,
+            "seed": args.seed,
+            "iterations": args.iterations,
+            "codebase_bytes": sum(len(c.encode("utf-8")) for c in codebase.values()),
+        },
+        "stages": results,
+        "import_profile": import_profile,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ingest, retrieval and snippet extraction.")
+    parser.add_argument("--files", type=int, default=300, help="Number of synthetic files")
+    parser.add_argument("--mix", default="", help="Language mix, e.g. py=0.5,js=0.3,go=0.2")
+    parser.add_argument("--funcs", type=int, default=12, help="Average functions per file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=50, help="Iterations per stage (ingest/startup use 1/5, min 20)")
+    parser.add_argument("--stages", default="", help="Comma-separated subset of stages to run")
+    parser.add_argument("--out", default="", help="Write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    print(f"Benchmarking {args.files} synthetic files…")
+    report = run(args)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
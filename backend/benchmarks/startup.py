@@ -0,0 +1,111 @@
+"""
+Cold-start profiling: import time of `main` and time from process launch to
+the first healthy response, with Supabase pointed at an unreachable address.
+
+Usage (from backend/):
+    python -m benchmarks.startup          # prints the slowest imports
+"""
+
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+BACKEND_DIR = str(Path(__file__).resolve().parent.parent)
+
+# Dependencies in a bad state: Supabase is a blackhole address, Groq key is fake
+COLD_ENV = {
+    "SUPABASE_URL": "http://10.255.255.1:9",
+    "SUPABASE_KEY": "bench-key",
+    "GROQ_API_KEY": "bench-key",
+}
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env.update(COLD_ENV)
+    env.pop("GITHUB_TOKEN", None)
+    return env
+
+
+def _reap(proc: subprocess.Popen, peaks: Optional[List[int]] = None) -> int:
+    """Wait for proc and return its exit code; appends its peak RSS in bytes to `peaks` if given."""
+    if peaks is None or not hasattr(os, "wait4"):
+        return proc.wait()
+    _, status, usage = os.wait4(proc.pid, 0)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peaks.append(usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024))
+    return proc.returncode
+
+
+def import_main(peaks: Optional[List[int]] = None) -> float:
+    """Seconds to import `main` in a fresh interpreter."""
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", "import main"], cwd=BACKEND_DIR, env=_env(),
+                            stdout=subprocess.DEVNULL)
+    if _reap(proc, peaks) != 0:
+        raise RuntimeError("`import main` failed")
+    return time.perf_counter() - t0
+
+
+def import_profile(top: int = 15) -> List[Tuple[str, int]]:
+    """Slowest modules (cumulative microseconds) from `python -X importtime -c "import main"`."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND_DIR,
+                            env=_env(), capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)", line)
+        # Only `main` and its direct imports so nested modules aren't double counted
+        if match and len(match.group(2)) <= 3:
+            rows.append((match.group(3), int(match.group(1))))
+    return sorted(rows, key=lambda r: r[1], reverse=True)[:top]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_live(timeout: float = 20.0, peaks: Optional[List[int]] = None) -> float:
+    """Seconds from launching uvicorn to the first 200 from /api/health/live."""
+    import httpx
+
+    port = _free_port()
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        # Same server flags as the Dockerfile
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--ws", "none", "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - t0 < timeout:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/api/health/live", timeout=0.5).status_code == 200:
+                    return time.perf_counter() - t0
+            except httpx.HTTPError:
+                pass
+            if proc.poll() is not None:
+                raise RuntimeError("uvicorn exited before becoming healthy")
+            time.sleep(0.01)
+        raise TimeoutError(f"No healthy response within {timeout}s")
+    finally:
+        proc.kill()
+        _reap(proc, peaks)
+
+
+def main():
+    print(f"import main:     {import_main() * 1000:8.1f} ms")
+    print(f"time to live:    {time_to_live() * 1000:8.1f} ms")
+    print("\nSlowest top-level imports:")
+    for module, micros in import_profile():
+        print(f"  {module:<30} {micros / 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Synthetic codebase generator.
+Produces deterministic { "relative/path.ext": "file content" } dicts that look
+enough like real projects to exercise the parser, scorer and snippet parser.
+"""
+
+import json
+import random
+import zipfile
+from pathlib import Path
+from typing import Dict, List
+
+# Default language mix (extension -> weight)
+DEFAULT_MIX = {"py": 0.4, "js": 0.25, "ts": 0.15, "go": 0.1, "md": 0.05, "json": 0.05}
+
+# Fixed question set replayed against every codebase
+QUESTIONS = [
+    "How does authentication work and where is the login handler?",
+    "Where are retries implemented for failed requests?",
+    "How is the database connection configured?",
+    "What does the main API router do?",
+    "Where is error handling middleware defined?",
+    "How are user models validated in the schema?",
+    "Which helper functions parse configuration files?",
+    "How does the cache invalidation logic work?",
+]
+
+_DIRS = ["src", "src/api", "src/auth", "src/db", "src/utils", "lib", "services", "handlers", "models", "config"]
+_NOUNS = ["user", "session", "token", "retry", "cache", "order", "payment", "config",
+          "route", "handler", "schema", "client", "queue", "event", "login", "error"]
+_VERBS = ["get", "load", "save", "parse", "validate", "handle", "build", "fetch", "retry", "refresh"]
+
+
+def _ident(rng: random.Random) -> str:
+    return f"{rng.choice(_VERBS)}_{rng.choice(_NOUNS)}"
+
+
+def _python_file(rng: random.Random, n_funcs: int) -> str:
+    lines = ['"""Generated module."""', "", "import os", "import json", ""]
+    for _ in range(n_funcs):
+        name = _ident(rng)
+        noun = rng.choice(_NOUNS)
+        lines += [
+            f"def {name}({noun}_id: int, retries: int = 3):",
+            f'    """Handle {noun} for the auth/database layer."""',
+            f"    for attempt in range(retries):",
+            f"        try:",
+            f"            result = _client.request('{noun}', {noun}_id)",
+            f"            return json.loads(result)",
+            f"        except Exception as error:",
+            f"            print('{name} failed', attempt, error)",
+            f"    return None",
+            "",
+        ]
+    return "\n".join(lines)
+
+
+def _js_file(rng: random.Random, n_funcs: int) -> str:
+    lines = ["import { api } from './api';", ""]
+    for _ in range(n_funcs):
+        name = _ident(rng).replace("_", "")
+        noun = rng.choice(_NOUNS)
+        lines += [
+            f"export async function {name}({noun}Id) {{",
+            f"    // fetch {noun} with retry and error handling",
+            f"    const res = await api.get(`/{noun}/${{{noun}Id}}`);",
+            f"    if (!res.ok) {{",
+            f"        throw new Error('{noun} request failed');",
+            f"    }}",
+            f"    return res.json();",
+            "}",
+            "",
+        ]
+    return "\n".join(lines)
+
+
+def _go_file(rng: random.Random, n_funcs: int) -> str:
+    lines = ["package main", "", 'import "fmt"', ""]
+    for _ in range(n_funcs):
+        name = _ident(rng).title().replace("_", "")
+        noun = rng.choice(_NOUNS)
+        lines += [
+            f"func {name}(id int) error {{",
+            f'    // handle {noun} lookup in the database',
+            f"    if id <= 0 {{",
+            f'        return fmt.Errorf("invalid {noun} id %d", id)',
+            f"    }}",
+            f"    return nil",
+            "}",
+            "",
+        ]
+    return "\n".join(lines)
+
+
+def _md_file(rng: random.Random, n_funcs: int) -> str:
+    lines = ["# Notes", ""]
+    for _ in range(n_funcs):
+        noun = rng.choice(_NOUNS)
+        lines += [f"## {noun.title()}", "", f"The {noun} module handles config, auth and retries.", ""]
+    return "\n".join(lines)
+
+
+def _json_file(rng: random.Random, n_funcs: int) -> str:
+    return json.dumps({rng.choice(_NOUNS): {"retries": rng.randint(1, 5), "timeout": 30} for _ in range(n_funcs)}, indent=2)
+
+
+_GENERATORS = {
+    "py": _python_file,
+    "js": _js_file,
+    "ts": _js_file,
+    "go": _go_file,
+    "md": _md_file,
+    "json": _json_file,
+}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Parse a mix spec like 'py=0.5,js=0.3,go=0.2'."""
+    mix = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        ext, _, weight = part.partition("=")
+        ext = ext.strip().lstrip(".")
+        if ext not in _GENERATORS:
+            raise ValueError(f"Unsupported language in mix: {ext} (choose from {', '.join(_GENERATORS)})")
+        mix[ext] = float(weight or 1.0)
+    if not mix:
+        raise ValueError("Empty language mix")
+    return mix
+
+
+def generate_codebase(
+    n_files: int,
+    mix: Dict[str, float] = DEFAULT_MIX,
+    funcs_per_file: int = 12,
+    seed: int = 0,
+) -> Dict[str, str]:
+    """Generate a deterministic synthetic codebase."""
+    rng = random.Random(seed)
+    exts = list(mix)
+    weights = [mix[e] for e in exts]
+    files = {}
+    i = 0
+    while len(files) < n_files:
+        ext = rng.choices(exts, weights)[0]
+        path = f"{rng.choice(_DIRS)}/{_ident(rng)}_{i}.{ext}"
+        n_funcs = max(1, int(rng.gauss(funcs_per_file, funcs_per_file / 3)))
+        files[path] = _GENERATORS[ext](rng, n_funcs)
+        i += 1
+    return files
+
+
+def write_codebase(files: Dict[str, str], root: str) -> None:
+    """Write a codebase under root/repo/ (mirrors a ZIP's top-level folder)."""
+    base = Path(root) / "repo"
+    for path, content in files.items():
+        target = base / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(content, encoding="utf-8")
+
+
+def write_zip(files: Dict[str, str], zip_path: str) -> None:
+    """Write a codebase as a ZIP with a single top-level folder, like a GitHub download."""
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for path, content in files.items():
+            zf.writestr(f"repo/{path}", content)
+
+
+def make_llm_answers(files: Dict[str, str], count: int, seed: int = 0) -> List[str]:
+    """
+    Build canned LLM answers in the format SYSTEM_PROMPT asks for.
+    Line ranges are deliberately jittered so citation fix-up paths get exercised.
+    """
+    rng = random.Random(seed)
+    paths = sorted(files)
+    answers = []
+    for _ in range(count):
+        snippets = []
+        for path in rng.sample(paths, min(4, len(paths))):
+            lines = files[path].split("\n")
+            start = rng.randint(1, max(1, len(lines) - 10))
+            end = min(len(lines), start + rng.randint(3, 15))
+            shift = rng.randint(-8, 8)
+            snippets.append({
+                "file": path,
+                "start_line": max(1, start + shift),
+                "end_line": max(1, end + shift),
+                "description": "Relevant logic",
+                "code": "\n".join(lines[start - 1:end]),
+            })
+        refs = " and ".join(f"`{s['file'].rsplit('/', 1)[-1]}`" for s in snippets)
+        answers.append(
+            f"The logic lives in {refs}.\n\n```json\n{json.dumps({'snippets': snippets}, indent=2)}\n```"
+        )
+    return answers
@@ -0,0 +1,144 @@
+"""
+Content-addressed file storage.
+File contents live once in a shared BlobStore as UTF-8 bytes keyed by hash;
+a Codebase is just a { path: hash } map that decodes lazily on access.
+Blobs are reference-counted, so dropping a Codebase frees contents no other
+codebase still uses.
+"""
+
+import hashlib
+import threading
+import weakref
+from typing import Dict, Iterator, MutableMapping, Optional
+
+
+def content_hash(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class BlobStore:
+    """Thread-safe, reference-counted { hash: utf-8 bytes } store."""
+
+    def __init__(self):
+        self._blobs: Dict[bytes, bytes] = {}
+        self._refs: Dict[bytes, int] = {}
+        self._lock = threading.Lock()
+
+    def put(self, content: str) -> bytes:
+        """Store content (or reuse an identical blob) and take a reference to it."""
+        return self.put_bytes(content.encode("utf-8", errors="surrogatepass"))
+
+    def put_bytes(self, data: bytes, key: Optional[bytes] = None) -> bytes:
+        """Store pre-encoded UTF-8 bytes; `key` may be precomputed (e.g. by an ingest worker)."""
+        key = key or content_hash(data)
+        with self._lock:
+            if key not in self._blobs:
+                self._blobs[key] = data
+            self._refs[key] = self._refs.get(key, 0) + 1
+        return key
+
+    def get(self, key: bytes) -> str:
+        return self._blobs[key].decode("utf-8", errors="surrogatepass")
+
+    def size(self, key: bytes) -> int:
+        return len(self._blobs[key])
+
+    def release(self, key: bytes) -> None:
+        """Drop one reference; the blob is freed when nothing uses it."""
+        with self._lock:
+            count = self._refs.get(key, 0) - 1
+            if count > 0:
+                self._refs[key] = count
+            else:
+                self._refs.pop(key, None)
+                self._blobs.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "blobs": len(self._blobs),
+                "bytes": sum(len(b) for b in self._blobs.values()),
+                "references": sum(self._refs.values()),
+            }
+
+
+# Process-wide store shared by every loaded codebase
+store = BlobStore()
+
+
+def _release_all(blob_store: BlobStore, paths: Dict[str, bytes]) -> None:
+    for key in paths.values():
+        blob_store.release(key)
+    paths.clear()
+
+
+class Codebase(MutableMapping):
+    """
+    { "relative/path.py": "file content" } backed by a BlobStore.
+    Behaves like the plain dict the parsers used to return.
+    """
+
+    def __init__(self, files: Optional[Dict[str, str]] = None, blob_store: BlobStore = store):
+        self._store = blob_store
+        self._paths: Dict[str, bytes] = {}
+        # Data computed from the contents (e.g. the citation index); reset on any change
+        self.derived: dict = {}
+        # Release blobs when this codebase is garbage collected (or release() is called)
+        self._finalizer = weakref.finalize(self, _release_all, blob_store, self._paths)
+        if files:
+            self.update(files)
+
+    def __getitem__(self, path: str) -> str:
+        return self._store.get(self._paths[path])
+
+    def __setitem__(self, path: str, content: str) -> None:
+        self._bind(path, self._store.put(content))
+
+    def set_blob(self, path: str, data: bytes, key: Optional[bytes] = None) -> None:
+        """Add a file from already-encoded UTF-8 bytes without a decode/encode round trip."""
+        self._bind(path, self._store.put_bytes(data, key))
+
+    def _bind(self, path: str, key: bytes) -> None:
+        self.derived.clear()
+        old = self._paths.get(path)
+        self._paths[path] = key
+        if old is not None:
+            self._store.release(old)
+
+    def __delitem__(self, path: str) -> None:
+        self.derived.clear()
+        self._store.release(self._paths.pop(path))
+
+    def __contains__(self, path) -> bool:
+        return path in self._paths
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._paths)
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Codebase) and other._store is self._store:
+            return self._paths == other._paths
+        return super().__eq__(other)
+
+    __hash__ = None
+
+    def hash_of(self, path: str) -> bytes:
+        """Content hash for a path; equal hashes mean identical contents."""
+        return self._paths[path]
+
+    def changed_paths(self, other: "Codebase") -> set:
+        """Paths added, removed or modified between two codebases."""
+        keys = self._paths.keys() | other._paths.keys()
+        return {p for p in keys if self._paths.get(p) != other._paths.get(p)}
+
+    def byte_size(self) -> int:
+        """Total UTF-8 bytes referenced (before deduplication)."""
+        return sum(self._store.size(k) for k in self._paths.values())
+
+    def release(self) -> None:
+        """Eagerly drop all blob references held by this codebase."""
+        self.derived.clear()
+        self._finalizer()
@@ -0,0 +1,283 @@
+"""
+Citation anchoring: find where an LLM-quoted snippet really lives.
+Keeps per-file arrays of normalized line hashes (no text) plus a path suffix
+index, then locates quoted code by voting on line offsets and checking the best
+offsets line by line, so cited line ranges can be corrected (or the cited file
+fixed) and each snippet marked verified or not.
+"""
+
+import hashlib
+import weakref
+from array import array
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+MIN_LINE_CHARS = 4         # shorter normalized lines ("}", "end") don't vote
+MAX_POSTINGS = 200         # lines this common across the codebase don't vote globally
+MAX_CANDIDATES = 8         # top-voted offsets checked line by line
+MIN_RUN_LINES = 3          # contiguous, in-order matching lines needed (all of them for shorter quotes)
+MIN_MATCH_SCORE = 0.5      # fraction of quoted lines that must line up in the cited file
+RELOCATE_MIN_SCORE = 0.8   # ...or in another file before the citation is moved there
+
+
+def _normalize(line: str) -> str:
+    """Whitespace-insensitive form of a line, so re-indented quotes still match."""
+    return " ".join(line.split())
+
+
+def line_hash(norm: str) -> int:
+    """
+    Stable 63-bit hash of a normalized line, identical in every process (unlike
+    hash()). Lines too short to vote get the bitwise complement, so they stay
+    comparable but are negative.
+    """
+    digest = hashlib.blake2b(norm.encode("utf-8", errors="surrogatepass"), digest_size=8).digest()
+    h = int.from_bytes(digest, "little") >> 1
+    return h if len(norm) >= MIN_LINE_CHARS else ~h
+
+
+class FileLines:
+    """
+    Line hashes of one file's non-blank lines and their 1-based line numbers.
+    Holds no text: callers slice lines from the file content when they need them.
+    """
+
+    __slots__ = ("hashes", "line_numbers", "line_count", "__weakref__")
+
+    def __init__(self, hashes: array, line_numbers: array, line_count: int):
+        self.hashes = hashes              # array('q'), one per non-blank line
+        self.line_numbers = line_numbers  # array('i'), non-blank position -> line number
+        self.line_count = line_count
+
+    @classmethod
+    def from_content(cls, content: str) -> "FileLines":
+        hashes, line_numbers = array("q"), array("i")
+        line_count = 0
+        for line_count, line in enumerate(content.split("\n"), 1):
+            norm = _normalize(line)
+            if norm:
+                hashes.append(line_hash(norm))
+                line_numbers.append(line_count)
+        return cls(hashes, line_numbers, line_count)
+
+    def __getstate__(self):
+        return self.hashes, self.line_numbers, self.line_count
+
+    def __setstate__(self, state):
+        self.hashes, self.line_numbers, self.line_count = state
+
+    def positions(self, h: int) -> Iterator[int]:
+        """Non-blank positions whose line hash is h (the scan itself runs in C)."""
+        pos = -1
+        while True:
+            try:
+                pos = self.hashes.index(h, pos + 1)
+            except ValueError:
+                return
+            yield pos
+
+    def span(self, start_pos: int, n: int) -> Tuple[int, int]:
+        """Line range covered by n non-blank lines starting at a non-blank position."""
+        start_pos = max(0, min(start_pos, len(self.line_numbers) - 1))
+        end_pos = max(start_pos, min(start_pos + n - 1, len(self.line_numbers) - 1))
+        return self.line_numbers[start_pos], self.line_numbers[end_pos]
+
+    def compare(self, quote: List[int], start_pos: int) -> Tuple[int, int]:
+        """(matching lines, longest contiguous run) with the quote placed at start_pos."""
+        matched = run = longest = 0
+        for i, h in enumerate(quote):
+            pos = start_pos + i
+            if 0 <= pos < len(self.hashes) and self.hashes[pos] == h:
+                matched += 1
+                run += 1
+                longest = max(longest, run)
+            else:
+                run = 0
+        return matched, longest
+
+    def locate(self, code: str, near_line: Optional[int] = None) -> Optional[Tuple[int, int, float]]:
+        """Best (start_line, end_line, score) for quoted code in this file, or None."""
+        quote = _quote_hashes(code)
+        votes = Counter()
+        for i, h in enumerate(quote):
+            if h >= 0:
+                for pos in self.positions(h):
+                    votes[(None, pos - i)] += 1
+        best = _best_alignment(quote, votes, lambda _: self, near_line)
+        if not best:
+            return None
+        _, start, score = best
+        return self.span(start, len(quote)) + (score,)
+
+
+def _quote_hashes(code: str) -> List[int]:
+    """Line hashes of the non-blank quoted lines, in order ("..." elisions dropped)."""
+    nonblank = [n for n in (_normalize(l) for l in (code or "").split("\n")) if n and n != "..."]
+    return [line_hash(n) for n in nonblank]
+
+
+def _best_alignment(quote: List[int], votes: Counter, lines_of: Callable, near_line: Optional[int]):
+    """
+    Check the top-voted (key, start) offsets line by line and return the best
+    (key, start, score) whose matching lines include a long enough contiguous run.
+    Ties go to the candidate closest to the cited line.
+    """
+    if not votes:
+        return None
+    ranked = votes.most_common()
+    cutoff = ranked[min(len(ranked), MAX_CANDIDATES) - 1][1]
+    required_run = min(MIN_RUN_LINES, len(quote))
+    silent = sum(1 for h in quote if h < 0)  # lines that match without voting
+    best, best_rank = None, None
+    for (key, start), count in ranked:
+        if count < cutoff or (best_rank and count + silent < best_rank[0]):
+            break  # can't match as many lines as the best so far
+        fl = lines_of(key)
+        matched, run = fl.compare(quote, start)
+        if run < required_run:
+            continue
+        distance = abs(fl.span(start, 1)[0] - near_line) if near_line is not None else 0
+        rank = (matched, run, -distance)
+        if best_rank is None or rank > best_rank:
+            best, best_rank = (key, start, matched / len(quote)), rank
+    return best
+
+
+# Line tables shared by every index whose files have the same contents (blob hash)
+_shared_lines: "weakref.WeakValueDictionary[bytes, FileLines]" = weakref.WeakValueDictionary()
+
+
+def share_lines(key: bytes, lines: FileLines) -> FileLines:
+    """Reuse the line table already held for a blob hash, or register this one."""
+    return _shared_lines.setdefault(key, lines)
+
+
+def _lines_for(codebase: Dict[str, str], path: str) -> FileLines:
+    hash_of = getattr(codebase, "hash_of", None)
+    if hash_of is None:
+        return FileLines.from_content(codebase[path])
+    key = hash_of(path)
+    lines = _shared_lines.get(key)
+    if lines is None:
+        lines = share_lines(key, FileLines.from_content(codebase[path]))
+    return lines
+
+
+class CitationIndex:
+    """Line tables and a path suffix index over a whole codebase."""
+
+    def __init__(self, codebase: Optional[Dict[str, str]] = None):
+        self.files: Dict[str, FileLines] = {}
+        self.suffixes: Dict[str, List[str]] = defaultdict(list)
+        for path in codebase or ():
+            self.add(path, _lines_for(codebase, path))
+
+    def add(self, path: str, lines: FileLines) -> None:
+        if path not in self.files:
+            parts = path.split("/")
+            for i in range(len(parts)):
+                self.suffixes["/".join(parts[i:]).lower()].append(path)
+        self.files[path] = lines
+
+    def resolve(self, ref: str) -> Optional[str]:
+        """Map a cited path (exact, relative, or a trailing fragment) to a codebase path in O(1)."""
+        if not ref:
+            return None
+        if ref in self.files:
+            return ref
+        key = ref.strip().strip("`").replace("\\", "/")
+        while key.startswith("./"):
+            key = key[2:]
+        key = key.lstrip("/").lower()
+        matches = self.suffixes.get(key)
+        if not matches:
+            return None
+        # Prefer the shortest path, e.g. `main.py` -> main.py over tests/fixtures/main.py
+        return min(matches, key=lambda p: (p.count("/"), len(p)))
+
+    def locate(self, code: str) -> Optional[Tuple[str, int, int, float]]:
+        """Best (path, start_line, end_line, score) for quoted code anywhere in the codebase."""
+        quote = _quote_hashes(code)
+        votes = Counter()
+        for i, h in enumerate(quote):
+            if h < 0:
+                continue
+            hits = []
+            for path, fl in self.files.items():
+                hits.extend((path, pos) for pos in fl.positions(h))
+                if len(hits) > MAX_POSTINGS:
+                    break
+            if len(hits) > MAX_POSTINGS:
+                continue  # boilerplate line; says nothing about where the quote is
+            for path, pos in hits:
+                votes[(path, pos - i)] += 1
+        best = _best_alignment(quote, votes, self.files.__getitem__, None)
+        if not best:
+            return None
+        path, start, score = best
+        return (path,) + self.files[path].span(start, len(quote)) + (score,)
+
+    def anchor(self, snippet: dict, codebase: Dict[str, str]) -> dict:
+        """
+        Resolve the cited file and move the line range onto the quoted code.
+        Sets `verified` when the quote matched; otherwise keeps the model's range.
+        `file` and `code` must be strings (or missing).
+        """
+        path = self.resolve(snippet.get("file") or "")
+        code = snippet.get("code") or ""
+        claimed = _as_int(snippet.get("start_line"))
+        match = None
+
+        if path and code:
+            found = self.files[path].locate(code, near_line=claimed)
+            if found and found[2] >= MIN_MATCH_SCORE:
+                match = (path,) + found
+        if not match and code:
+            found = self.locate(code)
+            # Moving a citation to another file needs much stronger evidence
+            if found and found[3] >= (MIN_MATCH_SCORE if found[0] == path else RELOCATE_MIN_SCORE):
+                match = found
+
+        if match:
+            path, start_line, end_line, score = match
+            verified = True
+        elif path:
+            line_count = self.files[path].line_count
+            start_line = max(1, claimed or 1)
+            end_line = min(line_count, max(start_line, _as_int(snippet.get("end_line")) or start_line + 9))
+            start_line = min(start_line, end_line)
+            score, verified = 0.0, False
+        else:
+            snippet["verified"] = False
+            return snippet
+
+        snippet["file"] = path
+        snippet["start_line"] = start_line
+        snippet["end_line"] = end_line
+        snippet["code"] = slice_lines(codebase[path], start_line, end_line)
+        snippet["verified"] = verified
+        snippet["match_score"] = round(score, 2)
+        return snippet
+
+
+def slice_lines(content: str, start_line: int, end_line: int) -> str:
+    """Lines start_line..end_line (1-based, inclusive) of a file's content."""
+    return "\n".join(content.split("\n")[max(0, start_line - 1):end_line])
+
+
+def _as_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_citation_index(codebase: Dict[str, str]) -> CitationIndex:
+    """Index for a codebase, cached on it when it supports derived-data caching (Codebase)."""
+    cache = getattr(codebase, "derived", None)
+    if cache is None:
+        return CitationIndex(codebase)
+    index = cache.get("citations")
+    if index is None:
+        index = cache["citations"] = CitationIndex(codebase)
+    return index
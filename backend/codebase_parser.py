@@ -1,14 +1,23 @@
 """
 Codebase parser: reads files from a directory or GitHub repo.
-Returns a dict of { "relative/path.py": "file content" }
+Returns a Codebase mapping of { "relative/path.py": "file content" },
+with contents stored once in the shared blob store.
 """
 
 import os
 import re
-import httpx
 import base64
+import asyncio
+import tracemalloc
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Callable, List, Optional, Tuple
+
+from blob_store import Codebase, content_hash
+from citations import CitationIndex, FileLines, share_lines
 
 # Extensions to index (code + config files)
 SUPPORTED_EXTENSIONS = {
@@ -30,16 +39,24 @@ SKIP_PATTERNS = {
 MAX_FILE_SIZE = 200 * 1024  # 200 KB per file
 MAX_FILES = 300
 
+# Process pool for CPU-bound ingest work (0 = one worker per core)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "0")) or os.cpu_count() or 1
+INGEST_BATCH_SIZE = 32  # ZIP members per worker task
+
+# Progress callback: called with keyword counts, e.g. progress(discovered=10, parsed=4)
+ProgressCallback = Optional[Callable[..., None]]
+
 
 def should_skip(path: str) -> bool:
     parts = Path(path).parts
     return any(part in SKIP_PATTERNS for part in parts)
 
 
-def parse_codebase(root_dir: str, source_name: str = "") -> Dict[str, str]:
+def parse_codebase(root_dir: str, source_name: str = "", progress: ProgressCallback = None) -> Codebase:
     """Walk a directory and collect file contents."""
-    files = {}
+    files = Codebase()
     root = Path(root_dir)
+    discovered = fetched = 0
 
     for file_path in root.rglob("*"):
         if len(files) >= MAX_FILES:
@@ -64,23 +81,141 @@ def parse_codebase(root_dir: str, source_name: str = "") -> Dict[str, str]:
         if file_path.stat().st_size > MAX_FILE_SIZE:
             continue
 
+        discovered += 1
         try:
             content = file_path.read_text(encoding="utf-8", errors="ignore")
-            # Strip top-level folder from path (from ZIP extraction)
-            parts = rel.split("/")
-            if len(parts) > 1:
-                # Remove the first folder (usually the zip root folder)
-                cleaned = "/".join(parts[1:]) if len(parts) > 1 else rel
-            else:
-                cleaned = rel
-            files[cleaned] = content
+            fetched += 1
+            files[_strip_root(rel)] = content
         except Exception:
             continue
+        finally:
+            if progress:
+                progress(discovered=discovered, fetched=fetched, parsed=len(files))
+
+    return files
+
+
+def _strip_root(rel: str) -> str:
+    """Strip the top-level folder from a path (usually the zip root folder)."""
+    parts = rel.split("/")
+    return "/".join(parts[1:]) if len(parts) > 1 else rel
+
+
+# ─── ZIP ingest (process pool) ────────────────────────────────────────────────
+
+_ingest_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_ingest_pool() -> ProcessPoolExecutor:
+    global _ingest_pool
+    if _ingest_pool is None:
+        # spawn: forking a process that runs an event loop and threads is unsafe
+        _ingest_pool = ProcessPoolExecutor(max_workers=INGEST_WORKERS, mp_context=get_context("spawn"))
+    return _ingest_pool
+
+
+def shutdown_ingest_pool() -> None:
+    global _ingest_pool
+    if _ingest_pool is not None:
+        _ingest_pool.shutdown(wait=False, cancel_futures=True)
+        _ingest_pool = None
+
+
+def list_zip_members(zip_path: str) -> List[Tuple[str, str]]:
+    """Eligible (member_name, cleaned_path) pairs, filtered like parse_codebase."""
+    members = []
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        for info in zf.infolist():
+            if len(members) >= MAX_FILES:
+                break
+            if info.is_dir():
+                continue
+            rel = info.filename.replace("\\", "/")
+            if should_skip(rel) or not _is_supported_path(rel):
+                continue
+            if info.file_size > MAX_FILE_SIZE:
+                continue
+            members.append((info.filename, _strip_root(rel)))
+    return members
+
+
+def _decode_zip_members(
+    zip_path: str, members: List[Tuple[str, str]], trace_memory: bool = False
+) -> Tuple[List[Tuple[str, bytes, bytes, FileLines]], Optional[int]]:
+    """
+    Worker-process task: read, decode, hash and line-index a batch of ZIP members.
+    Returns compact (path, content_hash, utf-8 bytes, line table) records ready
+    for the blob store and citation index, plus the batch's peak traced memory
+    in bytes when trace_memory is set (for benchmarks; None otherwise).
+    """
+    if trace_memory:
+        tracemalloc.start()
+    records = []
+    try:
+        with zipfile.ZipFile(zip_path, "r") as zf:
+            for name, path in members:
+                try:
+                    text = zf.read(name).decode("utf-8", errors="ignore")
+                except Exception:
+                    continue
+                data = text.encode("utf-8")
+                records.append((path, content_hash(data), data, FileLines.from_content(text)))
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return records, peak
 
+
+async def parse_zip(
+    zip_path: str, progress: ProgressCallback = None, worker_peaks: Optional[List[int]] = None
+) -> Codebase:
+    """
+    Index a ZIP without extracting it: members are decoded, hashed and
+    line-indexed across the ingest process pool in batches and merged into a
+    Codebase (with its citation index attached) as batches finish.
+    Pass a list as `worker_peaks` to collect each batch's peak memory in bytes.
+    """
+    members = await asyncio.to_thread(list_zip_members, zip_path)
+    if progress:
+        progress(discovered=len(members))
+
+    loop = asyncio.get_running_loop()
+    pool = get_ingest_pool()
+    futures = [
+        loop.run_in_executor(
+            pool, _decode_zip_members, zip_path, members[i:i + INGEST_BATCH_SIZE], worker_peaks is not None
+        )
+        for i in range(0, len(members), INGEST_BATCH_SIZE)
+    ]
+
+    files = Codebase()
+    index = CitationIndex()
+    fetched = 0
+    try:
+        for next_done in asyncio.as_completed(futures):
+            records, peak = await next_done
+            if worker_peaks is not None:
+                worker_peaks.append(peak)
+            fetched += len(records)
+            for path, key, data, lines in records:
+                files.set_blob(path, data, key)
+                index.add(path, share_lines(key, lines))
+            if progress:
+                progress(fetched=fetched, parsed=len(files), indexed=len(index.files))
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM); start a fresh pool for the next job
+        shutdown_ingest_pool()
+        raise
+    finally:
+        for future in futures:
+            future.cancel()
+
+    files.derived["citations"] = index
     return files
 
 
-async def fetch_github_repo(repo_url: str) -> Dict[str, str]:
+async def fetch_github_repo(repo_url: str, progress: ProgressCallback = None) -> Codebase:
     """
     Fetch a public GitHub repo via the GitHub API. 
     Uses GITHUB_TOKEN from environment if available to avoid rate limits.
@@ -90,6 +225,8 @@ async def fetch_github_repo(repo_url: str) -> Dict[str, str]:
     if not match:
         raise ValueError("Could not parse GitHub URL")
 
+    import httpx  # imported on first use to keep app startup fast
+
     owner, repo = match.group(1), match.group(2)
     api_base = f"https://api.github.com/repos/{owner}/{repo}"
     
@@ -99,7 +236,8 @@ async def fetch_github_repo(repo_url: str) -> Dict[str, str]:
     if token:
         headers["Authorization"] = f"token {token}"
     
-    files = {}
+    files = Codebase()
+    index = CitationIndex()
 
     async with httpx.AsyncClient(timeout=30.0) as client:
         # Get default branch
@@ -128,6 +266,9 @@ async def fetch_github_repo(repo_url: str) -> Dict[str, str]:
             item for item in tree.get("tree", [])
             if item["type"] == "blob" and _is_supported_path(item["path"])
         ][:MAX_FILES]
+        fetched = 0
+        if progress:
+            progress(discovered=len(blobs))
 
         # Fetch each file content
         for item in blobs:
@@ -144,16 +285,23 @@ async def fetch_github_repo(repo_url: str) -> Dict[str, str]:
                 )
                 if content_resp.status_code != 200:
                     continue
+                fetched += 1
                 data = content_resp.json()
                 if data.get("encoding") == "base64":
                     content = base64.b64decode(data["content"]).decode("utf-8", errors="ignore")
                     files[path] = content
+                    # Index each file as it arrives, between network waits
+                    index.add(path, share_lines(files.hash_of(path), FileLines.from_content(content)))
             except Exception:
                 continue
+            finally:
+                if progress:
+                    progress(fetched=fetched, parsed=len(files), indexed=len(index.files))
 
     if not files:
         raise ValueError("No supported source files found in repository.")
 
+    files.derived["citations"] = index
     return files
 
 
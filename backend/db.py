@@ -5,20 +5,24 @@ Replaces the SQLite implementation for better cloud deployment.
 
 import os
 import json
-from typing import Optional, List
+from typing import Optional, List, TYPE_CHECKING
 from datetime import datetime
-from supabase import create_client, Client
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
-_supabase: Optional[Client] = None
+_supabase: Optional["Client"] = None
 
-def get_db() -> Client:
+def get_db() -> "Client":
     global _supabase
     if _supabase is None:
         if not SUPABASE_URL or not SUPABASE_KEY:
             raise ValueError("SUPABASE_URL or SUPABASE_KEY not set in environment")
+        # Imported on first use: the supabase package is slow to import
+        from supabase import create_client
         _supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
     return _supabase
 
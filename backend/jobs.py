@@ -0,0 +1,137 @@
+"""
+Background ingestion jobs.
+Uploads and GitHub loads run as asyncio tasks off the request path; clients poll
+or stream progress (files discovered / fetched / parsed / indexed) by job id.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional
+
+MAX_CONCURRENT_JOBS = int(os.getenv("MAX_CONCURRENT_JOBS", "2"))
+MAX_QUEUED_JOBS = int(os.getenv("MAX_QUEUED_JOBS", "4"))  # waiting for a free slot
+MAX_JOB_HISTORY = 50  # finished jobs kept around for status lookups
+
+FINISHED_STATES = {"done", "error", "cancelled"}
+
+
+class JobCancelled(Exception):
+    """Raised from Job.update() so worker threads stop at their next progress tick."""
+
+
+class JobQueueFull(Exception):
+    """Raised by JobManager.submit() when MAX_QUEUED_JOBS jobs are already waiting."""
+
+
+class Job:
+    def __init__(self, kind: str, source: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.source = source
+        self.status = "queued"  # queued | running | done | error | cancelled
+        self.progress = {"discovered": 0, "fetched": 0, "parsed": 0, "indexed": 0}
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.cancel_requested = False
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def update(self, **counts: int) -> None:
+        """Progress callback handed to the ingest code; called on the event loop."""
+        if self.cancel_requested:
+            raise JobCancelled()
+        self.progress.update(counts)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "source": self.source,
+            "status": self.status,
+            "progress": dict(self.progress),
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """Tracks jobs and caps how many run at once in this process."""
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_JOBS, max_queued: int = MAX_QUEUED_JOBS):
+        self.jobs: Dict[str, Job] = {}
+        self.max_queued = max_queued
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrent))
+
+    def queue_full(self) -> bool:
+        return sum(1 for j in self.jobs.values() if j.status == "queued") >= self.max_queued
+
+    def submit(
+        self,
+        kind: str,
+        source: str,
+        work: Callable[[Job], Awaitable[dict]],
+        cleanup: Optional[Callable[[], None]] = None,
+    ) -> Job:
+        """
+        Schedule `work(job)` on the running loop and return the job immediately.
+        `cleanup` always runs once the job ends, even if it is cancelled while queued.
+        """
+        if self.queue_full():
+            raise JobQueueFull()
+        job = Job(kind, source)
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, work))
+        # A done-callback (not a finally in _run) so it also fires for tasks
+        # cancelled before they ever started running
+        job.task.add_done_callback(lambda _: self._finish(job, cleanup))
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.jobs.get(job_id)
+        if job and not job.finished:
+            job.cancel_requested = True
+            if job.task:
+                job.task.cancel()
+        return job
+
+    async def _run(self, job: Job, work: Callable[[Job], Awaitable[dict]]) -> None:
+        try:
+            async with self._semaphore:
+                job.status = "running"
+                job.result = await work(job)
+                job.status = "done"
+        except (asyncio.CancelledError, JobCancelled):
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "error"
+            job.error = str(e)
+
+    def _finish(self, job: Job, cleanup: Optional[Callable[[], None]]) -> None:
+        if not job.finished:
+            job.status = "cancelled"
+        try:
+            if cleanup:
+                cleanup()
+        finally:
+            job.finished_at = time.time()
+            self._prune()
+
+    def _prune(self) -> None:
+        finished = sorted(
+            (j for j in self.jobs.values() if j.finished),
+            key=lambda j: j.finished_at or 0,
+        )
+        for job in finished[:-MAX_JOB_HISTORY]:
+            self.jobs.pop(job.id, None)
@@ -6,18 +6,35 @@ Uses llama-3.3-70b-versatile for fast, high-quality answers.
 import os
 import json
 import re
-import httpx
-from typing import Dict, List, Tuple, Optional
+import asyncio
+from typing import AsyncIterator, Dict, List, Tuple, Optional, TYPE_CHECKING
+
+from citations import FileLines, _as_int, get_citation_index, slice_lines
+
+if TYPE_CHECKING:
+    import httpx
 
 GROQ_BASE_URL = "https://api.groq.com/openai/v1"
 MODEL = "llama-3.3-70b-versatile"
 MAX_CONTEXT_CHARS = 28000   # ~7k tokens of context for files
 MAX_SNIPPET_LINES = 60      # max lines per file snippet
+MAX_RATE_LIMIT_RETRIES = 2  # retries on Groq 429 responses
+REFACTOR_CONCURRENCY = int(os.getenv("REFACTOR_CONCURRENCY", "4"))  # parallel shard calls
+MAX_REFACTOR_SHARDS = 24    # caps LLM calls per whole-project refactor
+
+# Shared by every refactor request, so concurrent requests can't multiply the
+# number of in-flight Groq calls (asyncio primitives bind to a loop lazily)
+_refactor_slots = asyncio.Semaphore(max(1, REFACTOR_CONCURRENCY))
 
 def get_api_key():
     return os.getenv("GROQ_API_KEY", "")
 
 
+def _async_client(timeout: float) -> "httpx.AsyncClient":
+    import httpx  # imported on first use to keep app startup fast
+    return httpx.AsyncClient(timeout=timeout)
+
+
 # ─── Health Check ─────────────────────────────────────────────────────────────
 
 async def check_llm_health() -> Tuple[bool, str]:
@@ -25,7 +42,7 @@ async def check_llm_health() -> Tuple[bool, str]:
     if not api_key:
         return False, "GROQ_API_KEY not set in environment"
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with _async_client(10.0) as client:
             resp = await client.get(
                 f"{GROQ_BASE_URL}/models",
                 headers={"Authorization": f"Bearer {api_key}"},
@@ -69,6 +86,19 @@ def _score_file_relevance(path: str, content: str, question: str) -> float:
     return score
 
 
+def _format_file_chunk(path: str, content: str) -> Tuple[str, int]:
+    """Render one file for the prompt, truncating very long files. Returns (chunk, line_count)."""
+    lines = content.split("\n")
+    # Truncate very long files
+    if len(lines) > MAX_SNIPPET_LINES * 2:
+        # Take first MAX_SNIPPET_LINES and last 10
+        preview_lines = lines[:MAX_SNIPPET_LINES] + ["... (truncated) ..."] + lines[-10:]
+        display_content = "\n".join(preview_lines)
+    else:
+        display_content = content
+    return f"### FILE: {path}\n```\n{display_content}\n```\n", len(lines)
+
+
 def _build_context(codebase: Dict[str, str], question: str) -> Tuple[str, List[dict]]:
     """
     Select the most relevant files and build a context string.
@@ -89,16 +119,7 @@ def _build_context(codebase: Dict[str, str], question: str) -> Tuple[str, List[d
         if total_chars >= MAX_CONTEXT_CHARS:
             break
 
-        lines = content.split("\n")
-        # Truncate very long files
-        if len(lines) > MAX_SNIPPET_LINES * 2:
-            # Take first MAX_SNIPPET_LINES and last 10
-            preview_lines = lines[:MAX_SNIPPET_LINES] + ["... (truncated) ..."] + lines[-10:]
-            display_content = "\n".join(preview_lines)
-        else:
-            display_content = content
-
-        chunk = f"### FILE: {path}\n```\n{display_content}\n```\n"
+        chunk, line_count = _format_file_chunk(path, content)
         if total_chars + len(chunk) > MAX_CONTEXT_CHARS:
             # Include partial
             remaining = MAX_CONTEXT_CHARS - total_chars
@@ -107,7 +128,7 @@ def _build_context(codebase: Dict[str, str], question: str) -> Tuple[str, List[d
         context_parts.append(chunk)
         included_files.append({
             "path": path,
-            "line_count": len(lines),
+            "line_count": line_count,
             "relevance_score": round(score, 2),
         })
         total_chars += len(chunk)
@@ -121,22 +142,17 @@ def _extract_line_ranges(content: str, search_text: str, context_lines: int = 5)
     """Find the line range of a code snippet within file content."""
     if not search_text or not content:
         return None
-    lines = content.split("\n")
-    search_lines = [l.strip() for l in search_text.strip().split("\n") if l.strip()]
-    if not search_lines:
+    found = FileLines.from_content(content).locate(search_text)
+    if not found:
         return None
-
-    # Search for first line of snippet
-    for i, line in enumerate(lines):
-        if search_lines[0] in line:
-            start = max(0, i - context_lines)
-            end = min(len(lines), i + len(search_lines) + context_lines)
-            return {
-                "start_line": start + 1,
-                "end_line": end,
-                "snippet": "\n".join(lines[start:end]),
-            }
-    return None
+    lines = content.split("\n")
+    start = max(0, found[0] - 1 - context_lines)
+    end = min(len(lines), found[1] + context_lines)
+    return {
+        "start_line": start + 1,
+        "end_line": end,
+        "snippet": "\n".join(lines[start:end]),
+    }
 
 
 # ─── Main LLM Call ────────────────────────────────────────────────────────────
@@ -175,6 +191,47 @@ Given the codebase, provide specific refactor suggestions with:
 After your explanation, output the same JSON snippet format for the relevant code sections."""
 
 
+async def _chat(client: "httpx.AsyncClient", api_key: str, system: str, user_message: str) -> str:
+    """Single Groq chat completion. Retries briefly on 429 rate limits."""
+    for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+        resp = await client.post(
+            f"{GROQ_BASE_URL}/chat/completions",
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+            },
+            json={
+                "model": MODEL,
+                "messages": [
+                    {"role": "system", "content": system},
+                    {"role": "user", "content": user_message},
+                ],
+                "temperature": 0.2,
+                "max_tokens": 4096,
+            },
+        )
+        if resp.status_code == 429 and attempt < MAX_RATE_LIMIT_RETRIES:
+            try:
+                delay = float(resp.headers.get("retry-after", ""))
+            except ValueError:
+                delay = 2.0 ** attempt
+            await asyncio.sleep(min(delay, 20.0))
+            continue
+        resp.raise_for_status()
+        break
+    data = resp.json()
+    return data["choices"][0]["message"]["content"]
+
+
+def _clean_answer(raw_answer: str) -> str:
+    """Remove the trailing JSON snippet block for display."""
+    clean_answer = re.sub(r'```json\s*\{[\s\S]*?"snippets"[\s\S]*?```', "", raw_answer).strip()
+    # Fallback if regex didn't catch it
+    if "```json" in clean_answer:
+        clean_answer = clean_answer[:clean_answer.rfind("```json")].strip()
+    return clean_answer
+
+
 async def ask_llm_with_context(
     question: str,
     codebase: Dict[str, str],
@@ -200,36 +257,12 @@ QUESTION: {question}
 
 Remember to cite exact file paths and line numbers from the codebase above."""
 
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        resp = await client.post(
-            f"{GROQ_BASE_URL}/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "model": MODEL,
-                "messages": [
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": user_message},
-                ],
-                "temperature": 0.2,
-                "max_tokens": 4096,
-            },
-        )
-        resp.raise_for_status()
-        data = resp.json()
-
-    raw_answer = data["choices"][0]["message"]["content"]
+    async with _async_client(60.0) as client:
+        raw_answer = await _chat(client, api_key, system, user_message)
 
     # Parse the JSON snippet block from the answer
     snippets = _parse_snippets_from_answer(raw_answer, codebase)
-
-    # Clean answer (remove trailing JSON block for display)
-    clean_answer = re.sub(r'```json\s*\{[\s\S]*?"snippets"[\s\S]*?```', "", raw_answer).strip()
-    # Fallback if regex didn't catch it
-    if "```json" in clean_answer:
-        clean_answer = clean_answer[:clean_answer.rfind("```json")].strip()
+    clean_answer = _clean_answer(raw_answer)
 
     return {
         "answer": clean_answer or raw_answer,
@@ -240,49 +273,228 @@ Remember to cite exact file paths and line numbers from the codebase above."""
 
 
 def _parse_snippets_from_answer(raw: str, codebase: Dict[str, str]) -> List[dict]:
-    """Extract the JSON snippets block from LLM response."""
+    """
+    Extract the JSON snippets block from LLM response and anchor each snippet:
+    the quoted code is located in the codebase, line ranges are corrected to the
+    real match, and the snippet is tagged `verified` or not.
+    """
     snippets = []
+    index = get_citation_index(codebase)
 
     # Try to find JSON block
     json_match = re.search(r"```json\s*(\{[\s\S]*?\})\s*```", raw)
     if json_match:
         try:
             parsed = json.loads(json_match.group(1))
-            raw_snippets = parsed.get("snippets", [])
-            for s in raw_snippets:
-                file_path = s.get("file", "")
-                # Try to enrich with actual line content from codebase
-                if file_path in codebase:
-                    content = codebase[file_path]
-                    lines = content.split("\n")
-                    start = max(0, s.get("start_line", 1) - 1)
-                    end = min(len(lines), s.get("end_line", start + 10))
-                    actual_code = "\n".join(lines[start:end])
-                    s["code"] = actual_code
-                    s["start_line"] = start + 1
-                    s["end_line"] = end
-                snippets.append(s)
-        except (json.JSONDecodeError, KeyError):
-            pass
+        except json.JSONDecodeError:
+            parsed = None
+        raw_snippets = parsed.get("snippets") if isinstance(parsed, dict) else None
+        for s in raw_snippets if isinstance(raw_snippets, list) else []:
+            # Skip malformed entries on their own so the rest still come through
+            if not isinstance(s, dict):
+                continue
+            if not isinstance(s.get("file") or "", str) or not isinstance(s.get("code") or "", str):
+                continue
+            snippets.append(index.anchor(s, codebase))
 
     # Fallback: extract file references from text
     if not snippets:
         file_refs = re.findall(r"`([^`]+\.[a-zA-Z]{1,10})`", raw)
+        seen = set()
         for ref in file_refs:
-            # Try to match against codebase
-            for path in codebase:
-                if ref in path or path.endswith(ref):
-                    content = codebase[path]
-                    lines = content.split("\n")
-                    snippets.append({
-                        "file": path,
-                        "start_line": 1,
-                        "end_line": min(20, len(lines)),
-                        "description": f"Referenced in answer: {path}",
-                        "code": "\n".join(lines[:20]),
-                    })
-                    break
+            path = index.resolve(ref)
+            if not path or path in seen:
+                continue
+            seen.add(path)
+            end_line = min(20, index.files[path].line_count)
+            snippets.append({
+                "file": path,
+                "start_line": 1,
+                "end_line": end_line,
+                "description": f"Referenced in answer: {path}",
+                "code": slice_lines(codebase[path], 1, end_line),
+                "verified": False,
+            })
             if len(snippets) >= 5:
                 break
 
     return snippets[:8]  # Cap at 8 snippets
+
+
+# ─── Whole-Project Refactor (map-reduce) ──────────────────────────────────────
+
+REDUCE_PROMPT = """You are an expert software engineer consolidating refactor reviews.
+You are given refactor suggestions produced independently for different parts of ONE codebase.
+1. Merge duplicate or overlapping suggestions (e.g. the same pattern in several files) into one item listing every affected file.
+2. Rank the final list by impact, most valuable first.
+3. Keep the exact file paths and line ranges from the input; do not invent new ones.
+4. Keep before/after code examples where they were given.
+
+After your explanation, output the same JSON snippet format for the most important code sections."""
+
+
+def _shard_codebase(
+    codebase: Dict[str, str], question: str, max_chars: int = MAX_CONTEXT_CHARS
+) -> Tuple[List[List[Tuple[str, str]]], List[str]]:
+    """
+    Split the codebase into at most MAX_REFACTOR_SHARDS context-sized shards of
+    (path, chunk). Returns (shards, skipped paths).
+    Files are packed in relevance order, so when everything can't fit the most
+    relevant files win. If the packed files also fit in path order, that layout
+    is used instead so a shard tends to hold one module's files.
+    """
+    chunks = []
+    for path, content in codebase.items():
+        chunk, _ = _format_file_chunk(path, content)
+        if len(chunk) > max_chars:
+            chunk = chunk[:max_chars - 20] + "\n...(truncated)\n"
+        chunks.append((path, chunk, _score_file_relevance(path, content, question)))
+    chunks.sort(key=lambda x: x[2], reverse=True)
+
+    # First fit: each file goes in the first shard with room, or a new one while under the cap
+    shards, sizes, skipped = [], [], []
+    for path, chunk, _ in chunks:
+        for i, size in enumerate(sizes):
+            if size + len(chunk) <= max_chars:
+                shards[i].append((path, chunk))
+                sizes[i] += len(chunk)
+                break
+        else:
+            if len(shards) < MAX_REFACTOR_SHARDS:
+                shards.append([(path, chunk)])
+                sizes.append(len(chunk))
+            else:
+                skipped.append(path)
+
+    by_path = sorted((item for shard in shards for item in shard), key=lambda x: x[0])
+    packed, current, size = [], [], 0
+    for path, chunk in by_path:
+        if current and size + len(chunk) > max_chars:
+            packed.append(current)
+            current, size = [], 0
+        current.append((path, chunk))
+        size += len(chunk)
+    if current:
+        packed.append(current)
+    if len(packed) <= MAX_REFACTOR_SHARDS:
+        shards = packed
+    return shards, skipped
+
+
+def _dedupe_snippets(snippets: List[dict]) -> List[dict]:
+    """Drop snippets citing the same file and overlapping line ranges."""
+    kept = []
+    ranges = []  # (file, start, end) of kept snippets with usable line ranges
+    for s in snippets:
+        # Unresolved citations keep the model's raw values, which may be null or strings
+        start, end = _as_int(s.get("start_line")), _as_int(s.get("end_line"))
+        if start is not None and end is not None:
+            if any(f == s.get("file") and ks <= end and start <= ke for f, ks, ke in ranges):
+                continue
+            ranges.append((s.get("file"), start, end))
+        kept.append(s)
+    return kept
+
+
+async def refactor_codebase(question: str, codebase: Dict[str, str]) -> AsyncIterator[dict]:
+    """
+    Whole-project refactor: analyze every shard concurrently (map), then merge,
+    dedupe and rank the per-shard suggestions in one final call (reduce).
+    Yields events as they happen:
+      { type: "start", shards, files, skipped }  (skipped: paths left out to stay within MAX_REFACTOR_SHARDS)
+      { type: "shard", index, files, suggestions, snippets } or { type: "shard", index, error }
+      { type: "final", suggestions, snippets, source }
+    """
+    api_key = get_api_key()
+    if not api_key:
+        raise ValueError("GROQ_API_KEY not configured. Please set it in the .env file.")
+
+    shards, skipped = _shard_codebase(codebase, question)
+    total_files = sum(len(shard) for shard in shards)
+    yield {"type": "start", "shards": len(shards), "files": total_files, "skipped": skipped}
+
+    async with _async_client(60.0) as client:
+
+        async def analyze(index: int, shard: List[Tuple[str, str]]) -> dict:
+            paths = [path for path, _ in shard]
+            context = "\n".join(chunk for _, chunk in shard)
+            user_message = f"""CODEBASE SHARD {index + 1}/{len(shards)} ({len(shard)} of {len(codebase)} files):
+
+{context}
+
+---
+REFACTOR REQUEST: {question}
+
+Only suggest changes for the files shown above. Cite exact file paths and line numbers."""
+            try:
+                async with _refactor_slots:
+                    raw = await _chat(client, api_key, REFACTOR_PROMPT, user_message)
+            except Exception as e:
+                return {"type": "shard", "index": index, "files": paths, "error": str(e)}
+            return {
+                "type": "shard",
+                "index": index,
+                "files": paths,
+                "suggestions": _clean_answer(raw) or raw,
+                "snippets": _parse_snippets_from_answer(raw, codebase),
+            }
+
+        tasks = [asyncio.create_task(analyze(i, shard)) for i, shard in enumerate(shards)]
+        results = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                if "error" not in result:
+                    results.append(result)
+                yield result
+        finally:
+            # Client went away mid-stream: don't keep paying for shard calls
+            for task in tasks:
+                task.cancel()
+
+        if not results:
+            raise RuntimeError("Refactor analysis failed for every shard.")
+
+        results.sort(key=lambda r: r["index"])
+        all_snippets = _dedupe_snippets([s for r in results for s in r["snippets"]])
+        source = f"{total_files} files analyzed in {len(shards)} shards"
+        if skipped:
+            source += f" ({len(skipped)} less relevant files skipped)"
+
+        if len(results) == 1:
+            yield {
+                "type": "final",
+                "suggestions": results[0]["suggestions"],
+                "snippets": all_snippets[:8],
+                "source": source,
+            }
+            return
+
+        # Reduce: give each shard an equal share of the context budget
+        per_shard = MAX_CONTEXT_CHARS // len(results)
+        parts = []
+        for r in results:
+            citations = "\n".join(
+                f"- {s.get('file')} lines {s.get('start_line')}-{s.get('end_line')}: {s.get('description', '')}"
+                for s in r["snippets"]
+            )
+            parts.append(f"### SHARD {r['index'] + 1} ({', '.join(r['files'][:5])}{'…' if len(r['files']) > 5 else ''})\n"
+                         f"{r['suggestions'][:per_shard]}\nCitations:\n{citations}\n")
+        user_message = f"""PER-SHARD REFACTOR SUGGESTIONS ({len(results)} shards, {total_files} files):
+
+{chr(10).join(parts)}
+
+---
+REFACTOR REQUEST: {question}
+
+Merge, dedupe and rank these into one list of suggestions."""
+
+        raw = await _chat(client, api_key, REDUCE_PROMPT, user_message)
+
+    snippets = _parse_snippets_from_answer(raw, codebase) or all_snippets[:8]
+    yield {
+        "type": "final",
+        "suggestions": _clean_answer(raw) or raw,
+        "snippets": snippets,
+        "source": source,
+    }
@@ -1,28 +1,42 @@
 import os
 import json
+import asyncio
 import zipfile
 import tempfile
 import shutil
-import sqlite3
 import re
 import time
-import httpx
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Optional, List
 from datetime import datetime
 
 from fastapi import FastAPI, UploadFile, File, HTTPException, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 load_dotenv()
 
-from codebase_parser import parse_codebase, fetch_github_repo
-from llm_handler import ask_llm_with_context, check_llm_health
+from codebase_parser import parse_zip, fetch_github_repo, shutdown_ingest_pool
+from llm_handler import ask_llm_with_context, check_llm_health, refactor_codebase, get_api_key
 from db import init_db, save_qa, get_recent_qas, get_all_tags, get_qa_by_id, check_db_health
+from jobs import JobManager, Job, JobCancelled, JobQueueFull
+from blob_store import Codebase, store
 
-app = FastAPI(title="Codebase Q&A with Proof", version="1.0.0")
+
+# ─── Lifespan ─────────────────────────────────────────────────────────────────
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Check the DB in the background: a slow or unreachable Supabase must not delay startup
+    db_check = asyncio.create_task(asyncio.to_thread(init_db))
+    yield
+    db_check.cancel()
+    shutdown_ingest_pool()
+
+
+app = FastAPI(title="Codebase Q&A with Proof", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -32,10 +46,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory store for current codebase session
-current_codebase: dict = {}
+# In-memory store for current codebase session. Replacing it drops the old
+# Codebase, which releases any blobs no other codebase references.
+current_codebase: Codebase = Codebase()
 
-init_db()
+# Background ingestion jobs (upload / GitHub)
+jobs = JobManager()
 
 
 # ─── Models ───────────────────────────────────────────────────────────────────
@@ -50,10 +66,16 @@ class GitHubRequest(BaseModel):
 
 # ─── Health ───────────────────────────────────────────────────────────────────
 
+@app.get("/api/health/live")
+async def liveness():
+    """Liveness probe: answers as soon as the app is up, without touching dependencies."""
+    return {"status": "ok"}
+
+
 @app.get("/api/health")
 async def health_check():
     """Status page - checks backend, DB, and LLM connection."""
-    db_ok, db_msg = check_db_health()
+    db_ok, db_msg = await asyncio.to_thread(check_db_health)
 
     llm_ok, llm_msg = await check_llm_health()
 
@@ -63,74 +85,169 @@ async def health_check():
         "llm": {"status": "ok" if llm_ok else "error", "message": llm_msg},
         "codebase_loaded": len(current_codebase) > 0,
         "file_count": len(current_codebase),
+        "storage": store.stats(),
     }
 
 
 # ─── Upload ZIP ───────────────────────────────────────────────────────────────
 
-@app.post("/api/upload")
-async def upload_zip(file: UploadFile = File(...)):
-    """Upload a ZIP file of a codebase."""
-    global current_codebase
+def _loaded_summary(label: str, source: str) -> dict:
+    return {
+        "message": f"{label}: {len(current_codebase)} files indexed",
+        "file_count": len(current_codebase),
+        "files": list(current_codebase.keys())[:50],
+        "source": source,
+    }
 
-    if not file.filename.endswith(".zip"):
-        raise HTTPException(status_code=400, detail="Only .zip files are supported.")
 
-    # 50 MB limit
-    contents = await file.read()
-    if len(contents) > 50 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="File too large. Max 50 MB.")
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024  # 50 MB
+UPLOAD_COPY_CHUNK = 1024 * 1024
 
-    tmp_dir = tempfile.mkdtemp()
-    zip_path = os.path.join(tmp_dir, "upload.zip")
 
+def _spool_upload(src, path: str) -> Optional[str]:
+    """
+    Copy an upload (already spooled to disk by Starlette) to `path` without
+    reading it into memory. Returns an error message if it's rejected.
+    """
+    src.seek(0, os.SEEK_END)
+    if src.tell() > MAX_UPLOAD_BYTES:
+        return "File too large. Max 50 MB."
+    src.seek(0)
+    with open(path, "wb") as dst:
+        shutil.copyfileobj(src, dst, UPLOAD_COPY_CHUNK)
+    if not zipfile.is_zipfile(path):
+        return "Invalid ZIP file."
+    return None
+
+
+def _remove_file(path: str) -> None:
     try:
-        with open(zip_path, "wb") as f:
-            f.write(contents)
+        os.remove(path)
+    except FileNotFoundError:
+        pass
 
-        with zipfile.ZipFile(zip_path, "r") as zf:
-            zf.extractall(tmp_dir)
 
-        current_codebase = parse_codebase(tmp_dir, source_name=file.filename)
+def _queue_full_error() -> HTTPException:
+    return HTTPException(status_code=429, detail="Too many ingestion jobs queued. Try again shortly.")
 
-        return {
-            "message": f"Codebase loaded: {len(current_codebase)} files indexed",
-            "file_count": len(current_codebase),
-            "files": list(current_codebase.keys())[:50],
-            "source": file.filename,
-        }
-    except zipfile.BadZipFile:
-        raise HTTPException(status_code=400, detail="Invalid ZIP file.")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing ZIP: {str(e)}")
-    finally:
-        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+@app.post("/api/upload", status_code=202)
+async def upload_zip(file: UploadFile = File(...)):
+    """Upload a ZIP file of a codebase. Returns a job id; poll /api/jobs/{id} for progress."""
+    if not file.filename.endswith(".zip"):
+        raise HTTPException(status_code=400, detail="Only .zip files are supported.")
+    if jobs.queue_full():
+        raise _queue_full_error()
+
+    filename = file.filename
+
+    # Copy to our own temp file (the upload's is closed with the request) in a
+    # thread, so large uploads neither sit in memory nor block the event loop
+    fd, zip_path = tempfile.mkstemp(suffix=".zip")
+    os.close(fd)
+    try:
+        error = await asyncio.to_thread(_spool_upload, file.file, zip_path)
+    except BaseException:
+        _remove_file(zip_path)
+        raise
+    if error:
+        _remove_file(zip_path)
+        raise HTTPException(status_code=400, detail=error)
+
+    async def work(job: Job) -> dict:
+        global current_codebase
+        # Decoding and citation indexing run in the ingest process pool; the
+        # event loop only merges results
+        try:
+            codebase = await parse_zip(zip_path, progress=job.update)
+        except JobCancelled:
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Error processing ZIP: {str(e)}")
+        current_codebase = codebase
+        return _loaded_summary("Codebase loaded", filename)
+
+    try:
+        job = jobs.submit("upload", filename, work, cleanup=lambda: _remove_file(zip_path))
+    except JobQueueFull:
+        _remove_file(zip_path)
+        raise _queue_full_error()
+    return {"message": "Upload accepted", **job.to_dict()}
 
 
 # ─── GitHub Repo ──────────────────────────────────────────────────────────────
 
-@app.post("/api/github")
+@app.post("/api/github", status_code=202)
 async def load_github(req: GitHubRequest):
-    """Fetch a public GitHub repo and index it."""
-    global current_codebase
-
+    """Fetch a public GitHub repo and index it in the background. Returns a job id."""
     url = req.repo_url.strip()
     # Validate GitHub URL
     if not re.match(r"https?://github\.com/[\w\-]+/[\w\-\.]+", url):
         raise HTTPException(status_code=400, detail="Invalid GitHub URL. Use format: https://github.com/owner/repo")
 
+    async def work(job: Job) -> dict:
+        global current_codebase
+        try:
+            codebase = await fetch_github_repo(url, progress=job.update)
+        except JobCancelled:
+            raise
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            raise RuntimeError(f"Error loading GitHub repo: {str(e)}")
+        current_codebase = codebase
+        return _loaded_summary("GitHub repo loaded", url)
+
     try:
-        current_codebase = await fetch_github_repo(url)
-        return {
-            "message": f"GitHub repo loaded: {len(current_codebase)} files indexed",
-            "file_count": len(current_codebase),
-            "files": list(current_codebase.keys())[:50],
-            "source": url,
-        }
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Error loading GitHub repo: {str(e)}")
+        job = jobs.submit("github", url, work)
+    except JobQueueFull:
+        raise _queue_full_error()
+    return {"message": "GitHub load accepted", **job.to_dict()}
+
+
+# ─── Ingestion Jobs ───────────────────────────────────────────────────────────
+
+def _get_job_or_404(job_id: str) -> Job:
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Current status and progress of an ingestion job."""
+    return _get_job_or_404(job_id).to_dict()
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job(job_id: str):
+    """Server-Sent Events stream of job progress; closes when the job finishes."""
+    job = _get_job_or_404(job_id)
+
+    async def events():
+        last = None
+        while True:
+            payload = json.dumps(job.to_dict())
+            if payload != last:
+                yield f"data: {payload}\n\n"
+                last = payload
+            if job.finished:
+                break
+            await asyncio.sleep(0.25)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running ingestion job."""
+    _get_job_or_404(job_id)
+    return jobs.cancel(job_id).to_dict()
 
 
 # ─── Ask Question ─────────────────────────────────────────────────────────────
@@ -240,3 +357,29 @@ async def suggest_refactor(req: QuestionRequest):
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/refactor/project")
+async def suggest_refactor_project(req: QuestionRequest):
+    """
+    Whole-project refactor suggestions. Streams NDJSON events: one per analyzed
+    shard as it finishes, then a final merged, ranked result.
+    """
+    if not current_codebase:
+        raise HTTPException(status_code=400, detail="No codebase loaded.")
+    if not req.question.strip():
+        raise HTTPException(status_code=400, detail="Please describe what to refactor.")
+    # Fail before streaming starts, so clients get a real error status
+    if not get_api_key():
+        raise HTTPException(status_code=500, detail="GROQ_API_KEY not configured. Please set it in the .env file.")
+
+    codebase = current_codebase
+
+    async def events():
+        try:
+            async for event in refactor_codebase(req.question, codebase):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
@@ -0,0 +1,141 @@
+import json
+import pickle
+
+from blob_store import Codebase
+from citations import CitationIndex, FileLines, get_citation_index
+from llm_handler import _parse_snippets_from_answer
+
+A_PY = """import os
+
+
+def load_config(path):
+    with open(path) as f:
+        data = f.read()
+    return parse(data)
+
+
+def parse(data):
+    result = {}
+    for line in data.splitlines():
+        key, _, value = line.partition("=")
+        result[key.strip()] = value.strip()
+    return result
+"""
+
+B_PY = """class Cache:
+    def __init__(self):
+        self.items = {}
+
+    def get(self, key):
+        return self.items.get(key)
+
+    def put(self, key, value):
+        self.items[key] = value
+        return None
+"""
+
+CODEBASE = {"src/a.py": A_PY, "src/b.py": B_PY}
+
+
+def anchor(snippet, codebase=CODEBASE):
+    return get_citation_index(codebase).anchor(dict(snippet), codebase)
+
+
+def test_exact_quote_verifies():
+    s = anchor({"file": "src/a.py", "start_line": 4, "end_line": 7,
+                "code": "def load_config(path):\n    with open(path) as f:\n        data = f.read()\n    return parse(data)"})
+    assert s["verified"] and s["match_score"] == 1.0
+    assert (s["start_line"], s["end_line"]) == (4, 7)
+
+
+def test_shifted_line_numbers_are_corrected():
+    s = anchor({"file": "a.py", "start_line": 40, "end_line": 44,
+                "code": "def parse(data):\n    result = {}\n    for line in data.splitlines():"})
+    assert s["verified"]
+    assert s["file"] == "src/a.py"
+    assert (s["start_line"], s["end_line"]) == (10, 12)
+    assert s["code"].startswith("def parse(data):")
+
+
+def test_reindented_quote_verifies():
+    s = anchor({"file": "src/b.py", "start_line": 1, "end_line": 3,
+                "code": "def put(self, key, value):\nself.items[key] = value\n  return None"})
+    assert s["verified"]
+    assert (s["start_line"], s["end_line"]) == (8, 10)
+
+
+def test_wrong_file_moves_only_on_a_strong_match():
+    s = anchor({"file": "src/a.py", "start_line": 1, "end_line": 3,
+                "code": "class Cache:\n    def __init__(self):\n        self.items = {}"})
+    assert s["verified"] and s["file"] == "src/b.py"
+    assert (s["start_line"], s["end_line"]) == (1, 3)
+
+
+def test_made_up_quote_does_not_verify():
+    s = anchor({"file": "src/a.py", "start_line": 1, "end_line": 2,
+                "code": "z = totally_made_up()\nreturn None"})
+    assert s["verified"] is False
+    assert s["file"] == "src/a.py"
+
+
+def test_one_real_line_in_an_invented_quote_does_not_verify():
+    s = anchor({"file": "src/b.py", "start_line": 5, "end_line": 8,
+                "code": "def get(self, key):\n    log(key)\n    key = key.lower()\n    return fetch(key)"})
+    assert s["verified"] is False
+
+
+def test_weak_match_in_another_file_does_not_move_citation():
+    # Three real lines from b.py padded with invented ones: enough for a run, not to relocate
+    s = anchor({"file": "src/a.py", "start_line": 1, "end_line": 6,
+                "code": "def put(self, key, value):\n    self.items[key] = value\n    return None\n"
+                        "    self.flush()\n    self.log(key)\n    self.count += 1"})
+    assert s["verified"] is False and s["file"] == "src/a.py"
+
+
+def test_line_tables_are_shared_between_identical_codebases():
+    first, second = Codebase(CODEBASE), Codebase(CODEBASE)
+    a, b = get_citation_index(first), get_citation_index(second)
+    assert a is not b
+    assert a.files["src/a.py"] is b.files["src/a.py"]
+
+
+def test_line_tables_survive_pickling():
+    lines = FileLines.from_content(A_PY)
+    copy = pickle.loads(pickle.dumps(lines))
+    assert copy.hashes == lines.hashes and copy.line_numbers == lines.line_numbers
+    assert copy.line_count == lines.line_count
+
+
+def test_unresolved_file_is_left_unverified():
+    s = anchor({"file": "nope/missing.py", "code": "x = 1"})
+    assert s["verified"] is False and s["file"] == "nope/missing.py"
+
+
+def _answer(snippets):
+    return "Explanation.\n\n```json\n" + json.dumps({"snippets": snippets}) + "\n```"
+
+
+def test_malformed_snippets_are_skipped_individually():
+    raw = _answer([
+        {"file": ["src/a.py"], "code": "def parse(data):"},
+        {"file": "src/a.py", "code": {"not": "a string"}},
+        "just a string",
+        {"file": "src/b.py", "start_line": 5, "end_line": 6,
+         "code": "def get(self, key):\n    return self.items.get(key)"},
+    ])
+    snippets = _parse_snippets_from_answer(raw, CODEBASE)
+    assert len(snippets) == 1
+    assert snippets[0]["file"] == "src/b.py" and snippets[0]["verified"]
+
+
+def test_non_list_snippets_fall_back_to_file_references():
+    raw = "See `src/a.py`.\n\n```json\n{\"snippets\": \"none\"}\n```"
+    snippets = _parse_snippets_from_answer(raw, CODEBASE)
+    assert [s["file"] for s in snippets] == ["src/a.py"]
+    assert snippets[0]["verified"] is False
+
+
+def test_index_without_codebase_supports_incremental_adds():
+    index = CitationIndex()
+    index.add("src/a.py", FileLines.from_content(A_PY))
+    assert index.resolve("a.py") == "src/a.py"
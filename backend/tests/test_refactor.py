@@ -0,0 +1,52 @@
+import json
+import random
+
+from llm_handler import MAX_CONTEXT_CHARS, MAX_REFACTOR_SHARDS, _dedupe_snippets, _parse_snippets_from_answer, _shard_codebase
+
+CODEBASE = {"src/a.py": "def load(path):\n    with open(path) as f:\n        return f.read()\n"}
+
+
+def test_dedupe_tolerates_unresolved_citations_with_bad_ranges():
+    raw = "```json\n" + json.dumps({"snippets": [
+        {"file": "missing/x.py", "start_line": None, "end_line": None, "code": "x = 1"},
+        {"file": "missing/y.py", "start_line": "ten", "end_line": "12", "code": "y = 2"},
+        {"file": "src/a.py", "start_line": 1, "end_line": 3,
+         "code": "def load(path):\n    with open(path) as f:\n        return f.read()"},
+        {"file": "src/a.py", "start_line": 2, "end_line": 3,
+         "code": "    with open(path) as f:\n        return f.read()"},
+    ]}) + "\n```"
+    snippets = _dedupe_snippets(_parse_snippets_from_answer(raw, CODEBASE))
+    assert [s["file"] for s in snippets] == ["missing/x.py", "missing/y.py", "src/a.py"]
+
+
+def _codebase(sizes):
+    # Long lines so files stay under the per-file line cap of the prompt chunks
+    line = "value = compute(" + "x" * 80 + ")\n"
+    return {f"m{i:03d}.py": line * (size // len(line)) for i, size in enumerate(sizes)}
+
+
+def test_shards_respect_the_cap_and_report_skipped_files():
+    rng = random.Random(0)
+    codebase = _codebase(rng.randint(1000, 6000) for _ in range(300))
+    shards, skipped = _shard_codebase(codebase, "refactor")
+    packed = [path for shard in shards for path, _ in shard]
+    assert len(shards) <= MAX_REFACTOR_SHARDS
+    assert all(sum(len(c) for _, c in shard) <= MAX_CONTEXT_CHARS for shard in shards)
+    assert sorted(packed + skipped) == sorted(codebase)
+    assert skipped
+
+
+def test_most_relevant_files_are_packed_first():
+    codebase = _codebase([15000] * 300)
+    codebase["zz_auth.py"] = "def auth_login():\n    return auth_token\n" * 20
+    shards, skipped = _shard_codebase(codebase, "auth")
+    packed = {path for shard in shards for path, _ in shard}
+    assert "zz_auth.py" in packed and "zz_auth.py" not in skipped
+    assert len(packed) + len(skipped) == len(codebase)
+
+
+def test_small_codebase_fits_in_path_order_without_skips():
+    codebase = _codebase([200] * 10)
+    shards, skipped = _shard_codebase(codebase, "anything")
+    assert skipped == []
+    assert [path for path, _ in shards[0]] == sorted(codebase)
@@ -31,12 +31,68 @@ export const api = {
 
     loadGithub: (repo_url) => request('POST', '/api/github', { repo_url }),
 
+    job: (jobId) => request('GET', `/api/jobs/${jobId}`),
+
+    cancelJob: (jobId) => request('DELETE', `/api/jobs/${jobId}`),
+
+    // Stream job progress over SSE; resolves with the job's result when done.
+    watchJob: (jobId, onProgress = () => {}) => new Promise((resolve, reject) => {
+        const source = new EventSource(`${API_BASE}/api/jobs/${jobId}/events`);
+        source.onmessage = (e) => {
+            const job = JSON.parse(e.data);
+            onProgress(job);
+            if (job.status === 'done') {
+                source.close();
+                resolve(job.result);
+            } else if (job.status === 'error' || job.status === 'cancelled') {
+                source.close();
+                reject(new Error(job.error || `Job ${job.status}`));
+            }
+        };
+        source.onerror = () => {
+            source.close();
+            reject(new Error('Lost connection to progress stream'));
+        };
+    }),
+
     ask: (question, tags = []) =>
         request('POST', '/api/ask', { question, tags }),
 
     refactor: (question) =>
         request('POST', '/api/refactor', { question }),
 
+    // Whole-project refactor: calls onEvent for each NDJSON event; resolves with the final event.
+    refactorProject: async (question, onEvent = () => {}) => {
+        const res = await fetch(`${API_BASE}/api/refactor/project`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ question }),
+        });
+        if (!res.ok) {
+            const err = await res.json().catch(() => ({ detail: res.statusText }));
+            throw new Error(err.detail || `HTTP ${res.status}`);
+        }
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let final = null;
+        for (;;) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            for (const line of lines.filter(Boolean)) {
+                const event = JSON.parse(line);
+                if (event.type === 'error') throw new Error(event.detail);
+                if (event.type === 'final') final = event;
+                onEvent(event);
+            }
+        }
+        if (!final) throw new Error('Refactor stream ended without a result');
+        return final;
+    },
+
     history: (search = '', tag = '') => {
         const params = new URLSearchParams();
         if (search) params.set('search', search);
@@ -25,6 +25,14 @@ export default function SnippetCard({ snippet, index }) {
                     )}
                 </div>
                 <div style={{ display: 'flex', alignItems: 'center', gap: '0.5rem', flexShrink: 0 }}>
+                    {snippet.verified !== undefined && (
+                        <span
+                            className={`badge ${snippet.verified ? 'badge-success' : 'badge-grey'}`}
+                            title={snippet.verified ? 'Quoted code was found at these lines' : 'Could not match the quoted code; lines are as cited'}
+                        >
+                            {snippet.verified ? '✓ Verified' : 'Unverified'}
+                        </span>
+                    )}
                     {snippet.start_line && (
                         <span className="line-range-badge">
                             L{snippet.start_line}–{snippet.end_line}
@@ -11,6 +11,27 @@ export default function UploadPanel() {
     const [loading, setLoading] = useState(false);
     const [githubUrl, setGithubUrl] = useState('');
     const [result, setResult] = useState(null);
+    const [job, setJob] = useState(null);
+
+    // Start a background ingestion job and follow its progress until it finishes.
+    const runJob = useCallback(async (start) => {
+        const accepted = await start();
+        setJob(accepted);
+        try {
+            return await api.watchJob(accepted.job_id, setJob);
+        } finally {
+            setJob(null);
+        }
+    }, []);
+
+    const cancelJob = async () => {
+        if (!job) return;
+        try {
+            await api.cancelJob(job.job_id);
+        } catch (e) {
+            addToast(`Cancel failed: ${e.message}`, 'error');
+        }
+    };
 
     const handleFile = useCallback(async (file) => {
         if (!file) return;
@@ -20,7 +41,7 @@ export default function UploadPanel() {
         }
         setLoading(true);
         try {
-            const data = await api.uploadZip(file);
+            const data = await runJob(() => api.uploadZip(file));
             setCodebase({ source: data.source, fileCount: data.file_count, files: data.files });
             setResult(data);
             addToast(`✓ ${data.file_count} files loaded from ZIP`, 'success');
@@ -29,7 +50,7 @@ export default function UploadPanel() {
         } finally {
             setLoading(false);
         }
-    }, [setCodebase, addToast]);
+    }, [setCodebase, addToast, runJob]);
 
     const handleGithub = async () => {
         if (!githubUrl.trim()) {
@@ -38,7 +59,7 @@ export default function UploadPanel() {
         }
         setLoading(true);
         try {
-            const data = await api.loadGithub(githubUrl.trim());
+            const data = await runJob(() => api.loadGithub(githubUrl.trim()));
             setCodebase({ source: githubUrl.trim(), fileCount: data.file_count, files: data.files });
             setResult(data);
             addToast(`✓ ${data.file_count} files loaded from GitHub`, 'success');
@@ -87,7 +108,7 @@ export default function UploadPanel() {
                     {loading ? (
                         <div style={{ display: 'flex', flexDirection: 'column', alignItems: 'center', gap: '0.75rem' }}>
                             <div className="spinner" style={{ width: 32, height: 32 }}></div>
-                            <p>Parsing codebase…</p>
+                            <p>{job?.status === 'queued' ? 'Waiting for a free worker…' : 'Parsing codebase…'}</p>
                         </div>
                     ) : (
                         <>
@@ -145,6 +166,33 @@ export default function UploadPanel() {
                 </div>
             )}
 
+            {/* Job progress */}
+            {job && (
+                <div style={{ marginTop: '1.25rem', padding: '1rem', background: 'var(--bg-2)', border: '1px solid var(--border)', borderRadius: 'var(--radius-md)' }}>
+                    <div style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center', marginBottom: '0.5rem' }}>
+                        <strong style={{ fontSize: '0.85rem', color: 'var(--text-1)' }}>
+                            {job.status === 'queued' ? 'Queued' : 'Indexing'} · {job.source}
+                        </strong>
+                        <button className="btn btn-ghost" style={{ fontSize: '0.75rem', padding: '0.2rem 0.6rem' }} onClick={cancelJob}>
+                            Cancel
+                        </button>
+                    </div>
+                    <div style={{ height: 6, background: 'var(--bg-3)', borderRadius: 3, overflow: 'hidden', marginBottom: '0.5rem' }}>
+                        <div style={{
+                            height: '100%',
+                            width: `${job.progress.discovered ? Math.round(100 * job.progress.parsed / job.progress.discovered) : 0}%`,
+                            background: 'var(--accent)',
+                            transition: 'width 0.25s',
+                        }} />
+                    </div>
+                    <div style={{ display: 'flex', gap: '1rem', fontSize: '0.75rem', color: 'var(--text-3)' }}>
+                        {['discovered', 'fetched', 'parsed', 'indexed'].map(k => (
+                            <span key={k}>{k}: <strong style={{ color: 'var(--text-1)' }}>{job.progress[k]}</strong></span>
+                        ))}
+                    </div>
+                </div>
+            )}
+
             {/* Result summary */}
             {result && (
                 <div style={{ marginTop: '1.25rem', padding: '1rem', background: 'rgba(16,185,129,0.08)', border: '1px solid rgba(16,185,129,0.3)', borderRadius: 'var(--radius-md)' }}>
@@ -20,20 +20,34 @@ export default function RefactorPage() {
     const [topic, setTopic] = useState('');
     const [loading, setLoading] = useState(false);
     const [result, setResult] = useState(null);
+    const [wholeProject, setWholeProject] = useState(false);
+    const [shardProgress, setShardProgress] = useState(null); // { total, done: [shard events] }
+
+    const onShardEvent = (event) => {
+        if (event.type === 'start') {
+            setShardProgress({ total: event.shards, files: event.files, skipped: event.skipped?.length || 0, done: [] });
+        } else if (event.type === 'shard') {
+            setShardProgress(p => p && { ...p, done: [...p.done, event] });
+        }
+    };
 
     const handleRefactor = async () => {
         if (!topic.trim()) { addToast('Please describe what to refactor', 'error'); return; }
         if (!codebase) { addToast('Load a codebase first', 'error'); return; }
         setLoading(true);
         setResult(null);
+        setShardProgress(null);
         try {
-            const data = await api.refactor(topic.trim());
+            const data = wholeProject
+                ? await api.refactorProject(topic.trim(), onShardEvent)
+                : await api.refactor(topic.trim());
             setResult(data);
             addToast('Refactor suggestions ready!', 'success');
         } catch (e) {
             addToast(`Error: ${e.message}`, 'error');
         } finally {
             setLoading(false);
+            setShardProgress(null);
         }
     };
 
@@ -93,6 +107,16 @@ export default function RefactorPage() {
                         </div>
                     </div>
 
+                    <label style={{ display: 'flex', alignItems: 'center', gap: '0.5rem', fontSize: '0.85rem', color: 'var(--text-1)' }}>
+                        <input
+                            id="refactor-whole-project"
+                            type="checkbox"
+                            checked={wholeProject}
+                            onChange={e => setWholeProject(e.target.checked)}
+                        />
+                        Analyze the whole project (slower, covers every file)
+                    </label>
+
                     <button
                         id="refactor-btn"
                         className="btn btn-primary"
@@ -108,7 +132,27 @@ export default function RefactorPage() {
             {loading && (
                 <div className="loading-overlay">
                     <div className="spinner" style={{ width: 40, height: 40, borderWidth: 3 }}></div>
-                    <p>Analyzing codebase for refactor opportunities…</p>
+                    <p>
+                        {shardProgress
+                            ? `Analyzed ${shardProgress.done.length}/${shardProgress.total} shards (${shardProgress.files} files${shardProgress.skipped ? `, ${shardProgress.skipped} skipped` : ''})…`
+                            : 'Analyzing codebase for refactor opportunities…'}
+                    </p>
+                </div>
+            )}
+
+            {loading && shardProgress && shardProgress.done.length > 0 && (
+                <div style={{ display: 'flex', flexDirection: 'column', gap: '1rem', marginTop: '1.5rem' }}>
+                    {shardProgress.done.map(shard => (
+                        <div key={shard.index} className="card">
+                            <div style={{ display: 'flex', alignItems: 'center', gap: '0.75rem', marginBottom: '0.5rem' }}>
+                                <h3>Shard {shard.index + 1}</h3>
+                                <span style={{ fontSize: '0.75rem', color: 'var(--text-3)' }}>{shard.files.length} files</span>
+                            </div>
+                            <p style={{ whiteSpace: 'pre-wrap', fontSize: '0.85rem', lineHeight: 1.7, color: shard.error ? 'var(--danger)' : 'var(--text-1)' }}>
+                                {shard.error ? `Failed: ${shard.error}` : shard.suggestions}
+                            </p>
+                        </div>
+                    ))}
                 </div>
             )}
 